@@ -1,5 +1,7 @@
 import argparse
+import io
 import logging
+import sys
 import time
 
 from base.qubit_logic import MatrixState
@@ -19,6 +21,12 @@ def main() -> None:
         default=None,
         help="amount of partial transpose (must be <= size)",
     )
+    parser.add_argument(
+        "--precision",
+        choices=("f32", "f64"),
+        default="f64",
+        help="float precision of the eigenvalue computation",
+    )
     args = parser.parse_args()
 
     logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s: %(message)s")
@@ -28,7 +36,7 @@ def main() -> None:
         f"Starting computation for MatrixState(size={args.size}, left_sz={args.left_sz}, right_sz={args.right_sz})"
     )
     start_time = time.perf_counter()
-    matrix_state = MatrixState(args.size, args.left_sz, args.right_sz)
+    matrix_state = MatrixState(args.size, args.left_sz, args.right_sz, args.precision)
     duration = time.perf_counter() - start_time
 
     if args.partial_transpose is not None:
@@ -38,46 +46,47 @@ def main() -> None:
     n = args.size
     dim = 2**n
 
-    all_values = list(matrix_state.matrix.values()) + [0]
-    max_coeff_width = max(len(str(int(x))) for x in all_values)
+    max_coeff_width = max(
+        len(str(int(x))) for x in (matrix_state.dense.min(), matrix_state.dense.max(), 0)
+    )
     max_index_width = len(str(dim - 1))
     cell_width = max(max_coeff_width, max_index_width) + 1
 
+    # eigenvalues and negativity are computed lazily on first access, after any
+    # partial transpose; time that decomposition separately from construction.
+    start_time = time.perf_counter()
+    eigs = matrix_state.eigenvalues
+    negativity = matrix_state.negativity
+    analysis_duration = time.perf_counter() - start_time
+
+    buf = io.StringIO()
     header = " " * (max_index_width + 3)
     header += "".join(f"{col:>{cell_width}}" for col in range(dim))
-    print("\nMatrix coefficients (row = left index, col = right index):\n")
-    print(header)
-    print(" " * (max_index_width + 3) + "-" * (cell_width * dim))
-
-    for row in range(dim):
-        row_label = f"{row:>{max_index_width}} |"
-        row_entries = []
-        for col in range(dim):
-            coeff = matrix_state.matrix.get((row, col), 0)
-            row_entries.append(f"{coeff:>{cell_width}}")
-        print(f"{row_label}{''.join(row_entries)}")
-    print()
+    buf.write("\nMatrix coefficients (row = left index, col = right index):\n\n")
+    buf.write(header + "\n")
+    buf.write(" " * (max_index_width + 3) + "-" * (cell_width * dim) + "\n")
+
+    # Format one row at a time so only a single row of Python ints exists at once.
+    for row, values in enumerate(matrix_state.dense):
+        entries = "".join(f"{v:>{cell_width}}" for v in values.tolist())
+        buf.write(f"{row:>{max_index_width}} |{entries}\n")
+    buf.write("\n")
 
-    eigs = matrix_state.eigenvalues
     if eigs is not None:
-        print(f"Eigenvalues ({len(eigs)}):")
-        line = []
-        for i, eig in enumerate(eigs):
-            line.append(f"{eig:.6g}")
-            if (i + 1) % 8 == 0:
-                print("  " + "  ".join(line))
-                line = []
-        if line:
-            print("  " + "  ".join(line))
+        buf.write(f"Eigenvalues ({len(eigs)}):\n")
+        for i in range(0, len(eigs), 8):
+            buf.write("  " + "  ".join(f"{eig:.6g}" for eig in eigs[i : i + 8]) + "\n")
     else:
-        print("Eigenvalues could not be computed.")
+        buf.write("Eigenvalues could not be computed.\n")
 
-    if matrix_state.negativity is not None:
-        print(f"\nNegativity: {matrix_state.negativity:.6g}")
+    if negativity is not None:
+        buf.write(f"\nNegativity: {negativity:.6g}\n")
     else:
-        print("\nNegativity could not be computed.")
+        buf.write("\nNegativity could not be computed.\n")
 
+    sys.stdout.write(buf.getvalue())
     logger.info(f"Computed matrix in {duration:.6f} seconds")
+    logger.info(f"Computed eigenvalues and negativity in {analysis_duration:.6f} seconds")
 
 
 if __name__ == "__main__":
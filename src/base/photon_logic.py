@@ -1,45 +1,65 @@
 import logging
 from collections import Counter
-import math
+
+import numpy as np
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s:%(message)s")
 logger = logging.getLogger(__name__)
 
+
 class PhotonState:
     """
     Represents a two-mode photon Fock state |Bx, By> with coefficients, allowing superpositions.
-    State is stored as Counter mapping (Bx, By) tuples to float coefficients.
+    State is stored as parallel arrays: bx and by hold the occupation numbers of each term and
+    coeffs its float coefficient.
     """
 
     def __init__(self, Bx: int, By: int) -> None:
         if Bx < 0 or By < 0:
             raise ValueError("Bx and By must be non-negative integers")
-        self.state: Counter[tuple[int, int]] = Counter({(Bx, By): 1.0})
+        self.bx: np.ndarray = np.array([Bx], dtype=np.int64)
+        self.by: np.ndarray = np.array([By], dtype=np.int64)
+        self.coeffs: np.ndarray = np.array([1.0])
         logger.info(f"Initialized PhotonState with |{Bx}, {By}>")
 
+    @property
+    def state(self) -> Counter[tuple[int, int]]:
+        """The state as a Counter mapping (Bx, By) tuples to float coefficients."""
+        keys = zip(self.bx.tolist(), self.by.tolist(), strict=True)
+        return Counter(dict(zip(keys, self.coeffs.tolist(), strict=True)))
+
     def Jz(self) -> None:
         """
         Applies the Jz operator: Jz = ax*ay - ay*ax to the current state.
         Updates the state in-place. Jz|Bx, By> = sqrt((Bx+1)*By)|Bx+1, By-1> - sqrt((By+1)*Bx)|Bx-1, By+1>
         """
-        new_state: Counter[tuple[int, int]] = Counter()
-        for (bx, by), coeff in self.state.items():
-            if by > 0:
-                amp1 = math.sqrt(bx + 1) * math.sqrt(by)
-                state1 = (bx + 1, by - 1)
-                new_state[state1] += coeff * amp1
-                logger.debug(f"Jz term1: |{bx},{by}> -> {amp1:+.3f}|{state1[0]},{state1[1]}>")
-            if bx > 0:
-                amp2 = math.sqrt(by + 1) * math.sqrt(bx)
-                state2 = (bx - 1, by + 1)
-                new_state[state2] -= coeff * amp2
-                logger.debug(f"Jz term2: |{bx},{by}> -> {-amp2:+.3f}|{state2[0]},{state2[1]}>")
-        self.state = new_state
-        logger.info(f"After Jz, state has {len(self.state)} terms: {self.state}")
+        bx, by, coeffs = self.bx, self.by, self.coeffs
+        up = by > 0
+        amp1 = np.sqrt((bx[up] + 1) * by[up])
+        down = bx > 0
+        amp2 = np.sqrt((by[down] + 1) * bx[down])
+
+        terms_bx = np.concatenate([bx[up] + 1, bx[down] - 1])
+        terms_by = np.concatenate([by[up] - 1, by[down] + 1])
+        terms = np.concatenate([coeffs[up] * amp1, -coeffs[down] * amp2])
+
+        # Merge terms landing on the same |Bx, By>.
+        keys, index = np.unique(np.stack([terms_bx, terms_by], axis=1), axis=0, return_inverse=True)
+        self.bx = keys[:, 0]
+        self.by = keys[:, 1]
+        self.coeffs = np.zeros(len(keys))
+        np.add.at(self.coeffs, index.ravel(), terms)
+
+        if logger.isEnabledFor(logging.DEBUG):
+            for x, y, a in zip(bx[up], by[up], amp1, strict=True):
+                logger.debug("Jz term1: |%d,%d> -> %+.3f|%d,%d>", x, y, a, x + 1, y - 1)
+            for x, y, a in zip(bx[down], by[down], amp2, strict=True):
+                logger.debug("Jz term2: |%d,%d> -> %+.3f|%d,%d>", x, y, -a, x - 1, y + 1)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("After Jz, state has %d terms: %s", len(self.coeffs), self.state)
 
     def __repr__(self) -> str:
         parts = []
         for (bx, by), c in sorted(self.state.items()):
             parts.append(f"{c:+.3f}|{bx},{by}>")
         return " + ".join(parts) if parts else "0"
-
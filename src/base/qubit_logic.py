@@ -1,5 +1,8 @@
+import functools
 import logging
-from collections import Counter
+import math
+from collections.abc import Iterator
+from typing import Literal
 
 import numpy as np
 
@@ -7,48 +10,155 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s:%(mess
 logger = logging.getLogger(__name__)
 
 
+@functools.cache
+def _popcounts(size: int) -> np.ndarray:
+    """
+    Returns the number of set bits of each basis state 0 .. 2^size - 1.
+    The table is cached per size and shared, so it is returned read-only.
+    """
+    # SWAR popcount: sum bits in pairs, then nibbles, then bytes, and gather the byte sums
+    # into the top byte with one multiply.
+    x = np.arange(2**size, dtype=np.uint32)
+    x = x - ((x >> 1) & 0x55555555)
+    x = (x & 0x33333333) + ((x >> 2) & 0x33333333)
+    x = (x + (x >> 4)) & 0x0F0F0F0F
+    counts = (x * 0x01010101) >> 24
+    counts.flags.writeable = False
+    return counts
+
+
+def _coefficient_dtype(bound: int) -> type:
+    """
+    Returns the dtype for integer coefficients of magnitude at most bound: int64 when it fits,
+    otherwise object so that numpy falls back to exact Python ints instead of overflowing.
+    """
+    if bound <= np.iinfo(np.int64).max:
+        return np.int64
+    logger.warning(f"Coefficients up to {bound} overflow int64; using Python ints")
+    return object
+
+
+def _sorted_eigenvalues(arr: np.ndarray) -> np.ndarray:
+    """
+    Returns the real parts of the eigenvalues of arr in ascending order.
+
+    Only the basis states whose row or column has a nonzero entry are decomposed: every
+    other basis state contributes an exact zero eigenvalue, so low sz powers with a small
+    support never pay for a full 2^n x 2^n decomposition.
+    Symmetric matrices (equal left and right sz powers) go through eigvalsh; the general
+    product of two different SpinStates is not symmetric and falls back to eigvals.
+    """
+    support = np.flatnonzero(arr.any(axis=0) | arr.any(axis=1))
+    sub = arr[np.ix_(support, support)]
+    if np.array_equal(sub, sub.T):
+        eigs = np.linalg.eigvalsh(sub)
+    else:
+        eigs = np.linalg.eigvals(sub).real
+    zeros = np.zeros(arr.shape[0] - support.size, dtype=eigs.dtype)
+    return np.sort(np.concatenate([eigs, zeros]))
+
+
 class SpinState:
     """
     Represents an n-spin system superposition of bit states with integer coefficients.
     Each basis state is encoded as an integer from 0 to 2^n - 1.
+
+    Starting from |0>, sz keeps every basis state with the same popcount k at the same
+    coefficient, so the state is stored as the (size + 1) class coefficients in classes
+    (int64, or object holding Python ints once they outgrow int64). state broadcasts them
+    to the dense coefficient vector of length 2^n indexed by basis state.
     """
 
     def __init__(self, size: int) -> None:
         if size < 1:
             raise ValueError("size must be a positive integer")
         self.size: int = size
-        self.state: Counter[int] = Counter({0: 1})
+        self.classes: np.ndarray = np.zeros(size + 1, dtype=np.int64)
+        self.classes[0] = 1
         logger.info(f"Initialized SpinState(size={self.size}) with state={{0: 1}}")
 
-    def sz(self, power: int) -> None:
+    @property
+    def _popcnts(self) -> np.ndarray:
+        """Popcount of each basis state, shared across SpinStates of the same size."""
+        return _popcounts(self.size)
+
+    @property
+    def state(self) -> np.ndarray:
+        """The dense coefficient vector of length 2^n."""
+        return self.classes[self._popcnts]
+
+    def items(self) -> Iterator[tuple[int, int]]:
+        """Yields (basis_state, coefficient) pairs for the nonzero coefficients of the state."""
+        state = self.state
+        for basis in np.flatnonzero(state):
+            yield int(basis), int(state[basis])
+
+    def sz_classes(self, power: int) -> np.ndarray:
+        """
+        Returns the class coefficients of sz^power applied to the current state, without
+        modifying it.
+
+        sz sends each basis state to the sum of its single-bit flips, so it acts on the class
+        coefficients as c'[k] = k * c[k - 1] + (size - k) * c[k + 1].
+        """
         if power < 1:
             raise ValueError("power must be a positive integer")
-        for p in range(1, power + 1):
-            new_state: Counter[int] = Counter()
-            for basis, coeff in self.state.items():
-                for bit in range(self.size):
-                    flipped = basis ^ (1 << bit)
-                    new_state[flipped] += coeff
-            self.state = new_state
-            logger.info(f"After sz({p}), state has {len(self.state)} terms")
+        n = self.size
+        # Class k lives at index k + 1 of two preallocated buffers whose ends stay zero, so
+        # the recurrence needs no bounds checks.
+        classes = [0] + [int(c) for c in self.classes] + [0]
+        new_classes = [0] * (n + 3)
+        for _ in range(power):
+            for k in range(n + 1):
+                new_classes[k + 1] = k * classes[k] + (n - k) * classes[k + 2]
+            classes, new_classes = new_classes, classes
+        classes = classes[1:-1]
+        if logger.isEnabledFor(logging.INFO):
+            terms = sum(math.comb(n, k) for k, c in enumerate(classes) if c)
+            logger.info("After sz(%d), state has %d terms", power, terms)
+        dtype = _coefficient_dtype(max(abs(c) for c in classes))
+        return np.array(classes, dtype=dtype)
+
+    def sz_dense(self, power: int) -> np.ndarray:
+        """Returns the dense coefficients of sz^power applied to the current state."""
+        return self.sz_classes(power)[self._popcnts]
+
+    def sz(self, power: int) -> None:
+        self.classes = self.sz_classes(power)
+
+    def to_dense(self) -> np.ndarray:
+        """Returns the dense coefficient vector of length 2^n."""
+        return self.state
 
 
 class MatrixState:
     """
     Represents a tensor-product matrix of two SpinState systems of equal size.
-    Internally stored as a sparse mapping from (row_index, col_index) to coefficient.
+    Internally stored as a dense 2^n x 2^n int64 array (row = left index, col = right index);
+    the sparse mapping from (row_index, col_index) to coefficient is built on demand.
 
-    Additionally computes and stores:
-      - Dense numpy array representation of the matrix.
+    Additionally computes on first access:
       - Eigenvalues of the matrix.
       - The matrix normalized by its trace (as a numpy array).
       - Negativity: sum of negative eigenvalues of the normalized matrix.
+
+    precision selects the float type of the eigendecomposition: "f64" (default) or "f32",
+    which halves memory traffic at the cost of ~6 significant digits in the eigenvalues.
     """
 
-    def __init__(self, size: int, left_sz_power: int, right_sz_power: int) -> None:
+    def __init__(
+        self,
+        size: int,
+        left_sz_power: int,
+        right_sz_power: int,
+        precision: Literal["f32", "f64"] = "f64",
+    ) -> None:
         if size < 1:
             raise ValueError("size must be a positive integer")
+        if precision not in ("f32", "f64"):
+            raise ValueError("precision must be 'f32' or 'f64'")
         self.size: int = size
+        self.precision: Literal["f32", "f64"] = precision
         logger.info(
             f"Creating MatrixState(size={size}, left_sz={left_sz_power}, right_sz={right_sz_power})"
         )
@@ -61,67 +171,85 @@ class MatrixState:
         logger.info("Applying sz to right subsystem...")
         self.right.sz(right_sz_power)
 
-        self.matrix: dict[tuple[int, int], int] = {}
-        for i, ci in self.left.state.items():
-            for j, cj in self.right.state.items():
-                key = (i, j)
-                self.matrix[key] = self.matrix.get(key, 0) + ci * cj
-        logger.info(f"Tensor-product matrix constructed with {len(self.matrix)} nonzero entries")
+        # Entry (i, j) is left.classes[popcount(i)] * right.classes[popcount(j)], built
+        # straight from the class coefficients without materializing either SpinState.
+        left_cls = self.left.classes
+        right_cls = self.right.classes
+        dtype = _coefficient_dtype(int(np.abs(left_cls).max()) * int(np.abs(right_cls).max()))
+        popcounts = _popcounts(size)
+        self.dense: np.ndarray = np.multiply.outer(
+            left_cls.astype(dtype)[popcounts], right_cls.astype(dtype)[popcounts]
+        )
+        logger.info(
+            f"Tensor-product matrix constructed with {np.count_nonzero(self.dense)} nonzero entries"
+        )
 
-        self.eigenvalues: list[float] | None = None
-        self.normalized_matrix: np.ndarray | None = None
-        self.negativity: float | None = None
-        self._update_analysis()
+    @property
+    def matrix(self) -> dict[tuple[int, int], int]:
+        """Sparse mapping from (row_index, col_index) to nonzero coefficient."""
+        rows, cols = np.nonzero(self.dense)
+        keys = zip(rows.tolist(), cols.tolist(), strict=True)
+        return dict(zip(keys, self.dense[rows, cols].tolist(), strict=True))
+
+    @property
+    def normalized_matrix(self) -> np.ndarray | None:
+        """The matrix divided by its trace, or None if the trace is zero."""
+        tr = float(np.trace(self.dense))
+        if abs(tr) > 1e-12:
+            return self.dense.astype(float) / tr
+        return None
 
-    def _update_analysis(self) -> None:
+    @functools.cached_property
+    def eigenvalues(self) -> list[float] | None:
         """
-        Updates all derived data:
-          - eigenvalues (real part, sorted)
-          - normalized matrix (dense, by trace)
-          - negativity (sum of negative eigenvalues of normalized matrix)
+        Real parts of the eigenvalues in ascending order, or None if the decomposition fails.
+        Computed on first access and cached until the next partial_transpose.
         """
-        dim = 2**self.size
-        arr = np.zeros((dim, dim), dtype=float)
-        for (i, j), coeff in self.matrix.items():
-            arr[i, j] = coeff
+        # LAPACK needs C-contiguous input; converting with ascontiguousarray avoids a second
+        # hidden copy inside numpy.linalg should dense ever be a strided view.
+        dtype = np.float32 if self.precision == "f32" else np.float64
+        arr = np.ascontiguousarray(self.dense, dtype=dtype)
         try:
-            eigs = np.linalg.eigvals(arr)
-            self.eigenvalues = sorted(eigs.real.tolist())
-            logger.info(f"Eigenvalues updated ({len(self.eigenvalues)} total)")
+            eigenvalues: list[float] = _sorted_eigenvalues(arr).tolist()
         except Exception as exc:
             logger.error(f"Eigenvalue computation failed: {exc}")
-            self.eigenvalues = None
+            return None
+        logger.info(f"Eigenvalues updated ({len(eigenvalues)} total)")
+        return eigenvalues
 
-        tr = float(np.trace(arr))
-        if abs(tr) > 1e-12:
-            self.normalized_matrix = arr / tr
-            try:
-                norm_eigs = np.linalg.eigvals(self.normalized_matrix)
-                self.negativity = float(np.sum(norm_eigs.real[norm_eigs.real < 0]))
-                logger.info(f"Negativity updated: {self.negativity:.6g}")
-            except Exception as exc:
-                logger.error(f"Normalized eigenvalue computation failed: {exc}")
-                self.negativity = None
-        else:
-            self.normalized_matrix = None
-            self.negativity = None
+    @functools.cached_property
+    def negativity(self) -> float | None:
+        """
+        Sum of negative eigenvalues of the normalized matrix, or None if it cannot be computed.
+        Eigenvalues of the normalized matrix are the eigenvalues divided by the trace, so the
+        matrix is only decomposed once.
+        """
+        if self.eigenvalues is None:
+            return None
+        tr = float(np.trace(self.dense))
+        if abs(tr) <= 1e-12:
             logger.warning("Matrix trace is zero; cannot normalize.")
+            return None
+        norm_eigs = np.asarray(self.eigenvalues) / tr
+        negativity = float(np.sum(norm_eigs[norm_eigs < 0]))
+        logger.info(f"Negativity updated: {negativity:.6g}")
+        return negativity
 
     def partial_transpose(self, k: int) -> None:
         if k < 0 or k > self.size:
             raise ValueError("k must be between 0 and size")
-        mask = (1 << k) - 1
-        new_matrix: dict[tuple[int, int], int] = {}
-        for (i, j), coeff in self.matrix.items():
-            i_low = i & mask
-            i_high = i >> k
-            j_low = j & mask
-            j_high = j >> k
-            new_i = (i_high << k) | j_low
-            new_j = (j_high << k) | i_low
-            new_matrix[(new_i, new_j)] = new_matrix.get((new_i, new_j), 0) + coeff
-        self.matrix = new_matrix
+        # Splitting each index into (high, low) bits, entry (i_high, i_low, j_high, j_low)
+        # moves to (i_high, j_low, j_high, i_low): swap the two low-bit axes.
+        n = self.size
+        self.dense = (
+            self.dense.reshape(2 ** (n - k), 2**k, 2 ** (n - k), 2**k)
+            .swapaxes(1, 3)
+            .reshape(2**n, 2**n)
+            .copy(order="C")
+        )
         logger.info(
-            f"Performed partial transpose(k={k}), new matrix has {len(self.matrix)} nonzero entries"
+            f"Performed partial transpose(k={k}), new matrix has "
+            f"{np.count_nonzero(self.dense)} nonzero entries"
         )
-        self._update_analysis()
+        self.__dict__.pop("eigenvalues", None)
+        self.__dict__.pop("negativity", None)